@@ -1,5 +1,4 @@
 # customtkinter-based minimal UI for email sending and running consulta
-import os
 import threading
 import customtkinter as ctk
 from tkinter import messagebox
@@ -7,8 +6,6 @@ from dotenv import load_dotenv
 
 load_dotenv()
 
-SHEET_PATH = os.getenv("SHEET_PATH", "data/planilha_unica.xlsx").strip()
-
 ctk.set_appearance_mode("dark")
 ctk.set_default_color_theme("blue")
 
@@ -72,6 +69,10 @@ class App(ctk.CTk):
     def _set_status(self, text: str) -> None:
         self.status.configure(text=text)
 
+    def _ui(self, fn) -> None:
+        """Agenda fn no loop do Tk; widgets só podem ser mexidos pela thread principal."""
+        self.after(0, fn)
+
     def _add_email(self) -> None:
         email = (self.entry_email.get() or "").strip()
         if not email:
@@ -89,34 +90,45 @@ class App(ctk.CTk):
         self.listbox.configure(state="disabled")
 
     def _send_emails(self) -> None:
+        recipients = list(self.recipients) or None
+
+        def done() -> None:
+            self.btn_send.configure(state="normal")
+            self._set_status("Pronto.")
+
         def worker():
             try:
-                self.btn_send.configure(state="disabled")
+                from main import export_sheet
                 from mailer import send_weekly_email
-                send_weekly_email(SHEET_PATH, recipients=self.recipients or None)
-                messagebox.showinfo("E-mail", "E-mails enviados com sucesso!")
+                send_weekly_email(export_sheet(), recipients=recipients)
+                self._ui(lambda: messagebox.showinfo("E-mail", "E-mails enviados com sucesso!"))
             except Exception as e:
-                messagebox.showerror("Erro", f"Falha ao enviar e-mails:\n{e}")
+                msg = f"Falha ao enviar e-mails:\n{e}"
+                self._ui(lambda: messagebox.showerror("Erro", msg))
             finally:
-                self.btn_send.configure(state="normal")
-                self._set_status("Pronto.")
+                self._ui(done)
 
+        self.btn_send.configure(state="disabled")
         self._set_status("Enviando…")
         threading.Thread(target=worker, daemon=True).start()
 
     def _run_consulta(self) -> None:
+        def done() -> None:
+            self.btn_run.configure(state="normal")
+            self._set_status("Pronto.")
+
         def worker():
             try:
-                self.btn_run.configure(state="disabled")
                 from main import run_consulta
                 ref_date = run_consulta(send_email_if_day=False)
-                messagebox.showinfo("Consulta", f"Consulta concluída para {ref_date}.")
+                self._ui(lambda: messagebox.showinfo("Consulta", f"Consulta concluída para {ref_date}."))
             except Exception as e:
-                messagebox.showerror("Erro", f"Falha na consulta:\n{e}")
+                msg = f"Falha na consulta:\n{e}"
+                self._ui(lambda: messagebox.showerror("Erro", msg))
             finally:
-                self.btn_run.configure(state="normal")
-                self._set_status("Pronto.")
+                self._ui(done)
 
+        self.btn_run.configure(state="disabled")
         self._set_status("Consultando…")
         threading.Thread(target=worker, daemon=True).start()
 
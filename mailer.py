@@ -193,8 +193,9 @@ def send_weekly_email(sheet_path: str | None = None, recipients: List[str] | Non
 
 
 if __name__ == "__main__":
-    # Uso manual: envia o e-mail agora com a planilha configurada no .env
+    # Uso manual: regera a planilha a partir da base e envia o e-mail agora
     try:
-        send_weekly_email()
+        from main import export_sheet
+        send_weekly_email(export_sheet())
     except Exception as e:
         print("❌ Erro ao enviar e-mail:", e)
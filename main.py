@@ -1,11 +1,13 @@
 import os
-import json
+import orjson
 import argparse
-import requests
+import threading
+from types import MappingProxyType
+import numpy as np
 import pandas as pd
-from datetime import datetime, timedelta, timezone
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta, timezone
 from dotenv import load_dotenv
-from mailer import send_weekly_email
 
 load_dotenv()
 
@@ -13,11 +15,17 @@ FRED_API_KEY = os.getenv("FRED_API_KEY", "").strip()
 SERIES_BRENT_ID = os.getenv("SERIES_BRENT_ID", "DCOILBRENTEU").strip()         
 SERIES_DIESEL_FRED_ID = os.getenv("SERIES_DIESEL_FRED_ID", "DDFUELNYH").strip() 
 SHEET_PATH = os.getenv("SHEET_PATH", "data/planilha_unica.xlsx").strip()
+STORE_PATH = os.getenv("STORE_PATH", os.path.splitext(SHEET_PATH)[0] + ".parquet").strip()
 EMAIL_DAY = (os.getenv("EMAIL_DAY", "FRI").strip() or "FRI").upper()
 HEARTBEAT_PATH = os.getenv("HEARTBEAT_PATH", "runtime/heartbeat.json").strip()
+FRED_CACHE_PATH = os.getenv("FRED_CACHE_PATH", "runtime/fred_cache.sqlite").strip()
 
 REQUEST_TIMEOUT = 20
 GAL_TO_BBL = 42.0 
+LATEST_CACHE_TTL = 3600    # segundos; a "última observação" pode mudar ao longo do dia
+WEEKEND_CACHE_TTL = 6 * 3600  # sábado/domingo o FRED não publica observações diárias
+HISTORY_FROZEN_DAYS = 7    # intervalos encerrados há mais tempo que isso não mudam mais no FRED
+NEVER_EXPIRE = -1          # mesmo valor de requests_cache.NEVER_EXPIRE
 
 COLUMNS = [
     "Data",
@@ -35,10 +43,59 @@ COLUMNS = [
     "Diferença Relativa Semanal (%)",
 ]
 
-def _http_get(url: str, params: dict) -> dict:
-    r = requests.get(url, params=params, timeout=REQUEST_TIMEOUT)
+# Tipos das colunas numéricas na leitura da planilha legada (migração para a base Parquet):
+# já chegam como float64, sem passar por colunas object
+_XLSX_DTYPES = {col: "float64" for col in COLUMNS if col not in ("Data", "Semana Anual")}
+
+# Partes fixas das consultas ao FRED, montadas uma vez na importação
+_FRED_URL = "https://api.stlouisfed.org/fred/series/observations"
+_FRED_BASE_PARAMS = MappingProxyType({"api_key": FRED_API_KEY, "file_type": "json"})
+_FRED_LATEST_PARAMS = MappingProxyType({**_FRED_BASE_PARAMS, "sort_order": "desc", "limit": 20})
+
+_SESSION = None
+_SESSION_LOCK = threading.Lock()
+
+def _get_session():
+    """Sessão HTTP do FRED, criada no primeiro uso: importar este módulo (ex.: só para
+    exportar a planilha) não carrega requests/requests_cache nem abre o cache em disco.
+    """
+    global _SESSION
+    with _SESSION_LOCK:
+        if _SESSION is None:
+            import requests_cache
+            from requests.adapters import HTTPAdapter
+            from urllib3.util.retry import Retry
+
+            # Cache em disco das respostas do FRED (a api_key fica fora da chave do cache).
+            # Respostas expiradas com ETag/Last-Modified são revalidadas com requisição
+            # condicional (304 reaproveita o corpo em cache); se o FRED estiver fora, usa o cache.
+            session = requests_cache.CachedSession(
+                cache_name=FRED_CACHE_PATH,
+                backend="sqlite",
+                expire_after=LATEST_CACHE_TTL,
+                allowable_methods=("GET",),
+                ignored_parameters=["api_key"],
+                stale_if_error=True,
+            )
+            # Conexões keep-alive reaproveitadas entre chamadas + retentativas para erros transitórios
+            session.mount("https://", HTTPAdapter(
+                pool_connections=4,
+                pool_maxsize=4,
+                max_retries=Retry(total=3, backoff_factor=0.3, status_forcelist=(429, 500, 502, 503, 504)),
+            ))
+            _SESSION = session
+    return _SESSION
+
+def _http_get(url: str, params: dict, expire_after: int | None = None) -> dict:
+    """GET com cache. expire_after=None usa o TTL padrão da sessão (LATEST_CACHE_TTL)."""
+    params = dict(sorted(params.items()))  # ordem estável → chave de cache estável
+    r = _get_session().get(url, params=params, timeout=REQUEST_TIMEOUT, expire_after=expire_after)
     r.raise_for_status()
-    return r.json()
+    return orjson.loads(r.content)
+
+def _latest_cache_ttl() -> int:
+    """TTL do cache da "última observação": mais longo no fim de semana, quando a série não muda."""
+    return WEEKEND_CACHE_TTL if date.today().weekday() >= 5 else LATEST_CACHE_TTL
 
 def _fred_latest_observation(series_id: str, window_days: int = 40) -> tuple[str, float]:
     """
@@ -48,16 +105,12 @@ def _fred_latest_observation(series_id: str, window_days: int = 40) -> tuple[str
     if not FRED_API_KEY:
         raise RuntimeError("FRED_API_KEY ausente no .env")
 
-    url = "https://api.stlouisfed.org/fred/series/observations"
     params = {
+        **_FRED_LATEST_PARAMS,
         "series_id": series_id,
-        "api_key": FRED_API_KEY,
-        "file_type": "json",
-        "observation_start": (datetime.now(timezone.utc) - timedelta(days=window_days)).date().isoformat(),
-        "sort_order": "desc",
-        "limit": 20,
+        "observation_start": (date.today() - timedelta(days=window_days)).isoformat(),
     }
-    js = _http_get(url, params)
+    js = _http_get(_FRED_URL, params, expire_after=_latest_cache_ttl())
     for obs in js.get("observations", []):
         v = obs.get("value")
         if v is not None and v != ".":
@@ -79,17 +132,17 @@ def _fred_series_range(series_id: str, start_date: str, end_date: str) -> list[t
     if start_dt > end_dt:
         raise ValueError("Data inicial maior que data final no backfill")
 
-    url = "https://api.stlouisfed.org/fred/series/observations"
     params = {
+        **_FRED_BASE_PARAMS,
         "series_id": series_id,
-        "api_key": FRED_API_KEY,
-        "file_type": "json",
         "observation_start": start_dt.date().isoformat(),
         "observation_end": end_dt.date().isoformat(),
         "sort_order": "asc",
         "limit": 10000,
     }
-    js = _http_get(url, params)
+    # Observações de datas passadas são imutáveis no FRED: intervalos já encerrados nunca expiram
+    frozen = end_dt.date() < datetime.now(timezone.utc).date() - timedelta(days=HISTORY_FROZEN_DAYS)
+    js = _http_get(_FRED_URL, params, expire_after=NEVER_EXPIRE if frozen else None)
     data = []
     for obs in js.get("observations", []):
         v = obs.get("value")
@@ -109,6 +162,15 @@ def fetch_diesel_daily_from_fred() -> tuple[str, float]:
     d_date, d_gal = _fred_latest_observation(SERIES_DIESEL_FRED_ID)
     return d_date, float(d_gal) * GAL_TO_BBL
 
+def _fetch_pair(fetch_brent, fetch_diesel, *args):
+    """Executa as buscas de Brent e Diesel em paralelo (o FRED não tem consulta multi-série).
+    Retorna (resultado_brent, resultado_diesel); erros de qualquer uma são propagados.
+    """
+    with ThreadPoolExecutor(max_workers=2) as ex:
+        f_b = ex.submit(fetch_brent, *args)
+        f_d = ex.submit(fetch_diesel, *args)
+        return f_b.result(), f_d.result()
+
 def fetch_brent_range(start_date: str, end_date: str) -> list[tuple[str, float]]:
     return _fred_series_range(SERIES_BRENT_ID, start_date, end_date)
 
@@ -122,12 +184,11 @@ def fetch_diesel_range(start_date: str, end_date: str) -> list[tuple[str, float]
 # Suporte: email-day / semana
 # ------------------------------
 _DAY_MAP = {"MON": 0, "TUE": 1, "WED": 2, "THU": 3, "FRI": 4, "SAT": 5, "SUN": 6}
+_TARGET_WEEKDAY = _DAY_MAP.get(EMAIL_DAY, 4)  # Monday=0 ... Sunday=6; default: Friday
 
 def _is_email_day(date_iso: str) -> bool:
     """True se a data (YYYY-MM-DD) cair no dia configurado em EMAIL_DAY."""
-    w = pd.Timestamp(date_iso).weekday()  # Monday=0 ... Sunday=6
-    target = _DAY_MAP.get(EMAIL_DAY, 4)   # default: Friday
-    return w == target
+    return date.fromisoformat(date_iso).weekday() == _TARGET_WEEKDAY
 
 # ------------------------------
 # Planilha: garantir estrutura e calcular métricas
@@ -135,24 +196,30 @@ def _is_email_day(date_iso: str) -> bool:
 def _ensure_sheet(df: pd.DataFrame) -> pd.DataFrame:
     for col in COLUMNS:
         if col not in df.columns:
-            df[col] = pd.NA
+            df[col] = np.nan
     return df[COLUMNS]
 
 def _compute_metrics(df: pd.DataFrame) -> pd.DataFrame:
-    # Tipos de data e semana ISO
-    df["Data"] = pd.to_datetime(df["Data"]).dt.date
-    iso = pd.to_datetime(df["Data"]).dt.isocalendar()
-    df["Semana Anual"] = iso.week.astype(int)
+    # Data como datetime64 (no-op se já for) e semana ISO; a conversão para date fica na exportação xlsx
+    dates = pd.to_datetime(df["Data"])
+    df["Data"] = dates
+    df["Semana Anual"] = dates.dt.isocalendar().week.astype("int32")
+
+    # Preços convertidos uma única vez (e gravados de volta já em float64)
+    brent = pd.to_numeric(df["Petróleo Barril (USD)"], errors="coerce")
+    diesel = pd.to_numeric(df["Diesel Barril (USD)"], errors="coerce")
+    df["Petróleo Barril (USD)"] = brent
+    df["Diesel Barril (USD)"] = diesel
 
     # Variações diárias (fracionárias)
-    df["Variação Petróleo (%)"] = pd.to_numeric(df["Petróleo Barril (USD)"], errors="coerce").pct_change()
-    df["Variação Diesel (%)"] = pd.to_numeric(df["Diesel Barril (USD)"], errors="coerce").pct_change()
+    df["Variação Petróleo (%)"] = brent.pct_change()
+    df["Variação Diesel (%)"] = diesel.pct_change()
 
     # Médias móveis (7 e 30 dias)
-    df["Média Móvel semanal Petróleo"] = pd.to_numeric(df["Petróleo Barril (USD)"], errors="coerce").rolling(7, min_periods=7).mean()
-    df["Média móvel mensal Petróleo"] = pd.to_numeric(df["Petróleo Barril (USD)"], errors="coerce").rolling(30, min_periods=30).mean()
-    df["Média móvel Semanal Diesel"] = pd.to_numeric(df["Diesel Barril (USD)"], errors="coerce").rolling(7, min_periods=7).mean()
-    df["Média Móvel Mensal Diesel"] = pd.to_numeric(df["Diesel Barril (USD)"], errors="coerce").rolling(30, min_periods=30).mean()
+    df["Média Móvel semanal Petróleo"] = brent.rolling(7, min_periods=7).mean()
+    df["Média móvel mensal Petróleo"] = brent.rolling(30, min_periods=30).mean()
+    df["Média móvel Semanal Diesel"] = diesel.rolling(7, min_periods=7).mean()
+    df["Média Móvel Mensal Diesel"] = diesel.rolling(30, min_periods=30).mean()
 
     # Colunas semanais numéricas
     for col in ["E-mail Flag", "Spread Absoluto Semanal (USD)", "Diferença Relativa Semanal (%)"]:
@@ -160,6 +227,22 @@ def _compute_metrics(df: pd.DataFrame) -> pd.DataFrame:
 
     return df
 
+def _update_last_row_metrics(df: pd.DataFrame) -> pd.DataFrame:
+    """Inclusão diária de uma linha: calcula só as métricas da última linha, direto sobre as
+    últimas 30 cotações (mesmo resultado de pct_change/rolling com janela cheia).
+    """
+    i = df.index[-1]
+    df.at[i, "Semana Anual"] = df["Data"].iat[-1].isocalendar()[1]
+    for price_col, var_col, week_col, month_col in (
+        ("Petróleo Barril (USD)", "Variação Petróleo (%)", "Média Móvel semanal Petróleo", "Média móvel mensal Petróleo"),
+        ("Diesel Barril (USD)", "Variação Diesel (%)", "Média móvel Semanal Diesel", "Média Móvel Mensal Diesel"),
+    ):
+        p = df[price_col].iloc[-30:].to_numpy(dtype="float64")
+        df.at[i, var_col] = p[-1] / p[-2] - 1.0 if len(p) >= 2 else np.nan
+        df.at[i, week_col] = p[-7:].mean() if len(p) >= 7 else np.nan
+        df.at[i, month_col] = p.mean() if len(p) >= 30 else np.nan
+    return df
+
 # ------------------------------
 # Heartbeat (status)
 # ------------------------------
@@ -182,8 +265,8 @@ def _write_heartbeat(success: bool, error_msg: str | None = None) -> None:
     hb = {}
     if os.path.exists(HEARTBEAT_PATH):
         try:
-            with open(HEARTBEAT_PATH, "r", encoding="utf-8") as f:
-                hb = json.load(f)
+            with open(HEARTBEAT_PATH, "rb") as f:
+                hb = orjson.loads(f.read())
         except Exception:
             hb = {}
 
@@ -197,81 +280,158 @@ def _write_heartbeat(success: bool, error_msg: str | None = None) -> None:
         hb["last_error"] = today_str
         hb["last_error_msg"] = str(error_msg) if error_msg else "Erro não especificado"
 
-    with open(HEARTBEAT_PATH, "w", encoding="utf-8") as f:
-        json.dump(hb, f, ensure_ascii=False, indent=2)
+    # Escrita atômica (temporário + os.replace): uma interrupção nunca deixa o arquivo truncado
+    tmp_path = HEARTBEAT_PATH + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(orjson.dumps(hb, option=orjson.OPT_INDENT_2))
+    os.replace(tmp_path, HEARTBEAT_PATH)
+
+# ------------------------------
+# Base Parquet (fonte de verdade) e exportação xlsx
+# ------------------------------
+def _load_store() -> pd.DataFrame:
+    """Lê a base Parquet (ordenada por Data). Na primeira execução migra a planilha xlsx existente, se houver."""
+    if os.path.exists(STORE_PATH):
+        df = pd.read_parquet(STORE_PATH)
+        df["Data"] = pd.to_datetime(df["Data"])  # no-op se já for datetime64
+        return df
+    if os.path.exists(SHEET_PATH):
+        df = _ensure_sheet(pd.read_excel(SHEET_PATH, dtype=_XLSX_DTYPES)).sort_values("Data", ignore_index=True)
+        return _compute_metrics(df)
+    return pd.DataFrame(columns=COLUMNS).astype({"Data": "datetime64[ns]"})
+
+def _save_store(df: pd.DataFrame) -> None:
+    _ensure_parent_dir(STORE_PATH)
+    # Inclusões linha a linha/concat promovem a semana para int64/float64; grava sempre int32
+    df.astype({"Semana Anual": "int32"}).to_parquet(STORE_PATH, index=False)
+
+def _flush_xlsx(df: pd.DataFrame) -> None:
+    """Gera a planilha xlsx (anexo do e-mail) a partir do DataFrame da base.
+    Usa o xlsxwriter, bem mais rápido que o openpyxl para escrever (a leitura segue com openpyxl).
+    """
+    _ensure_parent_dir(SHEET_PATH)
+    df.assign(Data=df["Data"].dt.date).to_excel(SHEET_PATH, index=False, engine="xlsxwriter")
+
+def _sheet_is_current() -> bool:
+    """True se a planilha foi gerada depois da última gravação da base (nada a regenerar)."""
+    try:
+        return os.stat(SHEET_PATH).st_mtime_ns >= os.stat(STORE_PATH).st_mtime_ns
+    except OSError:
+        return False
+
+def export_sheet() -> str:
+    """Regenera SHEET_PATH a partir da base Parquet (ex.: antes de um envio manual),
+    só se a base mudou desde a última exportação. Retorna o caminho da planilha.
+    """
+    if not _sheet_is_current():
+        _flush_xlsx(_load_store())
+    return SHEET_PATH
 
 # ------------------------------
 # Atualizar a planilha com a linha do dia
 # ------------------------------
 def update_sheet(brent_date: str, brent_bbl: float, diesel_date: str, diesel_bbl: float) -> str:
     """
-    Atualiza a planilha com os valores do dia.
+    Atualiza a base com os valores do dia; a planilha xlsx só é regerada no dia do e-mail.
     Retorna a data de referência (string YYYY-MM-DD) que foi usada no registro.
     """
-    # Lê ou cria a planilha
-    try:
-        df = pd.read_excel(SHEET_PATH)
-    except FileNotFoundError:
-        df = pd.DataFrame(columns=COLUMNS)
+    df = _load_store()
 
     # Data do registro: usamos a mais recente disponível entre as duas séries
     ref_date = max(brent_date, diesel_date)
 
-    # Evita duplicar a mesma Data
-    if "Data" in df.columns and not df.empty:
-        if any(pd.to_datetime(df["Data"]).dt.strftime("%Y-%m-%d") == ref_date):
+    ref_ts = pd.Timestamp(ref_date)
+
+    # Evita duplicar a mesma Data. A base é ordenada por Data, então no caso comum
+    # (data posterior à última linha) não há o que procurar; senão, busca vetorizada em datetime64.
+    is_newest = df.empty or ref_ts > df["Data"].iat[-1]
+    if not is_newest:
+        idx = df.index[df["Data"].values == ref_ts.to_datetime64()]
+        if len(idx) > 0:
             # Mesmo assim, se for dia de e-mail e spreads estiverem vazios, atualizar spreads
-            idx = df.index[pd.to_datetime(df["Data"]).dt.strftime("%Y-%m-%d") == ref_date]
-            if len(idx) > 0 and _is_email_day(ref_date):
+            if _is_email_day(ref_date):
                 i = idx[-1]
                 df.at[i, "E-mail Flag"] = 1
                 df.at[i, "Spread Absoluto Semanal (USD)"] = float(diesel_bbl) - float(brent_bbl)
                 df.at[i, "Diferença Relativa Semanal (%)"] = (float(diesel_bbl) / float(brent_bbl)) - 1.0
-                df = _compute_metrics(df)
-                df.to_excel(SHEET_PATH, index=False)
+                _save_store(df)
+                _flush_xlsx(df)
                 print(f"ℹ Data {ref_date} já existia; spreads semanais atualizados (dia do e-mail).")
             else:
                 print(f"ℹ Data {ref_date} já registrada; nada a fazer.")
             return ref_date
 
-    # Monta a nova linha
+    # Monta a nova linha (NaN em vez de pd.NA mantém as colunas em float64 na base)
     email_flag = 1 if _is_email_day(ref_date) else 0
-    spread_abs = (float(diesel_bbl) - float(brent_bbl)) if email_flag == 1 else pd.NA
-    spread_pct = (float(diesel_bbl) / float(brent_bbl) - 1.0) if email_flag == 1 else pd.NA
+    spread_abs = (float(diesel_bbl) - float(brent_bbl)) if email_flag == 1 else np.nan
+    spread_pct = (float(diesel_bbl) / float(brent_bbl) - 1.0) if email_flag == 1 else np.nan
 
     new_row = {
-        "Data": ref_date,
-        "Semana Anual": pd.NA,  # calculado em _compute_metrics
+        "Data": ref_ts,
+        "Semana Anual": ref_ts.isocalendar()[1],
         "Petróleo Barril (USD)": float(brent_bbl),
         "Diesel Barril (USD)": float(diesel_bbl),
-        "Variação Petróleo (%)": pd.NA,
-        "Variação Diesel (%)": pd.NA,
-        "Média Móvel semanal Petróleo": pd.NA,
-        "Média móvel mensal Petróleo": pd.NA,
-        "Média móvel Semanal Diesel": pd.NA,
-        "Média Móvel Mensal Diesel": pd.NA,
+        "Variação Petróleo (%)": np.nan,  # métricas calculadas em _update_last_row_metrics
+        "Variação Diesel (%)": np.nan,
+        "Média Móvel semanal Petróleo": np.nan,
+        "Média móvel mensal Petróleo": np.nan,
+        "Média móvel Semanal Diesel": np.nan,
+        "Média Móvel Mensal Diesel": np.nan,
         "E-mail Flag": email_flag,
         "Spread Absoluto Semanal (USD)": spread_abs,
         "Diferença Relativa Semanal (%)": spread_pct,
     }
 
-    df = pd.concat([df, pd.DataFrame([new_row])], ignore_index=True)
-    df = _ensure_sheet(df)
-    df = _compute_metrics(df)
+    # Acrescenta in-place no fim (a base tem RangeIndex), sem copiar o DataFrame inteiro via concat
+    df.loc[len(df)] = new_row
+    if is_newest:
+        df = _update_last_row_metrics(df)
+    else:
+        # Data antiga que faltava na base (raro): reordena e recalcula o histórico
+        df = _compute_metrics(df.sort_values("Data", ignore_index=True))
 
-    df.to_excel(SHEET_PATH, index=False)
-    msg_week = " (fechamento semanal)" if email_flag == 1 else ""
-    print(f" Planilha atualizada com sucesso em {SHEET_PATH}{msg_week}")
+    _save_store(df)
+    if email_flag == 1:
+        _flush_xlsx(df)
+        print(f" Base atualizada em {STORE_PATH} e planilha gerada em {SHEET_PATH} (fechamento semanal)")
+    else:
+        print(f" Base atualizada com sucesso em {STORE_PATH}")
     return ref_date
 
+def update_sheet_bulk(new_df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Insere várias datas de uma vez (backfill): uma leitura, um cálculo de métricas e uma escrita.
+    new_df precisa das colunas "Data", "Petróleo Barril (USD)" e "Diesel Barril (USD)";
+    datas já registradas são sobrescritas pelos valores novos. Retorna a base atualizada.
+    """
+    new_df = new_df.copy()
+    dates = pd.to_datetime(new_df["Data"])
+    brent = new_df["Petróleo Barril (USD)"].astype(float)
+    diesel = new_df["Diesel Barril (USD)"].astype(float)
+
+    is_email = dates.dt.weekday == _TARGET_WEEKDAY
+    new_df["E-mail Flag"] = is_email.astype(int)
+    new_df["Spread Absoluto Semanal (USD)"] = (diesel - brent).where(is_email)
+    new_df["Diferença Relativa Semanal (%)"] = (diesel / brent - 1.0).where(is_email)
+
+    new_df["Data"] = dates
+    store = _load_store()
+    # Base vazia (primeiro backfill): sem concat com o frame vazio, que o pandas 2.2 marca como deprecated
+    df = new_df if store.empty else pd.concat([store, new_df], ignore_index=True)
+    df = df.drop_duplicates("Data", keep="last").sort_values("Data", ignore_index=True)
+    df = _compute_metrics(_ensure_sheet(df))
+
+    _save_store(df)
+    print(f" Base atualizada com sucesso em {STORE_PATH} ({len(new_df)} datas)")
+    return df
+
 def run_consulta(send_email_if_day: bool = True) -> str:
     """Executa a coleta, atualiza a planilha e opcionalmente envia e-mail no dia configurado.
     Retorna a data de referência usada no registro (YYYY-MM-DD).
     """
     try:
-        # 1) Coleta
-        b_date, b_val = fetch_brent_daily_from_fred()
-        d_date, d_val = fetch_diesel_daily_from_fred()
+        # 1) Coleta (as duas séries em paralelo)
+        (b_date, b_val), (d_date, d_val) = _fetch_pair(fetch_brent_daily_from_fred, fetch_diesel_daily_from_fred)
         print(f"Brent: {b_date} → {b_val:.4f} USD/bbl | Diesel: {d_date} → {d_val:.4f} USD/bbl")
 
         # 2) Atualiza planilha e pega a data usada
@@ -280,6 +440,7 @@ def run_consulta(send_email_if_day: bool = True) -> str:
         # 3) Se hoje é o dia do e-mail, enviar com a planilha anexa
         if send_email_if_day and _is_email_day(ref_date):
             try:
+                from mailer import send_weekly_email
                 send_weekly_email(SHEET_PATH)
             except Exception as e:
                 print(f" Erro ao enviar e-mail: {e}")
@@ -302,26 +463,34 @@ def run_backfill_range(start_date: str, end_date: str, send_email_if_day: bool =
     Retorna a lista de datas processadas.
     """
     try:
-        brent_hist = dict(fetch_brent_range(start_date, end_date))
-        diesel_hist = dict(fetch_diesel_range(start_date, end_date))
+        brent_list, diesel_list = _fetch_pair(fetch_brent_range, fetch_diesel_range, start_date, end_date)
+        brent = pd.Series(dict(brent_list), name="Petróleo Barril (USD)")
+        diesel = pd.Series(dict(diesel_list), name="Diesel Barril (USD)")
 
-        common_dates = sorted(set(brent_hist.keys()) & set(diesel_hist.keys()))
-        if not common_dates:
+        # Só as datas presentes nas duas séries (join interno pelo índice de datas ISO)
+        merged = pd.concat([brent, diesel], axis=1, join="inner").sort_index()
+        if merged.empty:
             raise RuntimeError("Sem datas em comum entre Brent e Diesel no intervalo solicitado")
-
-        processed: list[str] = []
-        for date_iso in common_dates:
-            ref_date = update_sheet(date_iso, brent_hist[date_iso], date_iso, diesel_hist[date_iso])
-            processed.append(ref_date)
-
-            if send_email_if_day and _is_email_day(ref_date):
+        common_dates = merged.index.tolist()
+
+        df = update_sheet_bulk(merged.rename_axis("Data").reset_index())
+
+        if send_email_if_day:
+            from mailer import send_weekly_email
+            dates = df["Data"]
+            for date_iso in common_dates:
+                if not _is_email_day(date_iso):
+                    continue
+                # Anexa a planilha como estava naquela data, como no envio semanal normal
+                _flush_xlsx(df[dates <= pd.Timestamp(date_iso)])
                 try:
                     send_weekly_email(SHEET_PATH)
                 except Exception as email_err:
-                    print(f" Erro ao enviar e-mail durante o backfill ({ref_date}): {email_err}")
+                    print(f" Erro ao enviar e-mail durante o backfill ({date_iso}): {email_err}")
 
+        _flush_xlsx(df)
         _write_heartbeat(success=True)
-        return processed
+        return common_dates
     except Exception as e:
         _write_heartbeat(success=False, error_msg=e)
         raise
@@ -1,10 +1,16 @@
 import os
-import json
-import requests
+import orjson
+from types import MappingProxyType
+import numpy as np
 import pandas as pd
 from datetime import datetime, timedelta, timezone, date
 from dotenv import load_dotenv
 from mailer import send_weekly_email  # <-- envia e-mail no dia configurado
+# Base, métricas e sessão HTTP/cache do FRED compartilhadas com main.py (mesmo arquivo de cache)
+from main import (
+    _load_store, _save_store, _flush_xlsx, _update_last_row_metrics,
+    _FRED_URL, _http_get, _latest_cache_ttl, _fetch_pair,
+)
 
 load_dotenv()
 
@@ -12,28 +18,14 @@ FRED_API_KEY = os.getenv("FRED_API_KEY", "").strip()
 SERIES_BRENT_ID = os.getenv("SERIES_BRENT_ID", "DCOILBRENTEU").strip()          # Brent (USD/bbl)
 SERIES_DIESEL_FRED_ID = os.getenv("SERIES_DIESEL_FRED_ID", "DDFUELNYH").strip() # ULSD NY Harbor (USD/gal)
 SHEET_PATH = os.getenv("SHEET_PATH", "data/planilha_unica.xlsx").strip()
+STORE_PATH = os.getenv("STORE_PATH", os.path.splitext(SHEET_PATH)[0] + ".parquet").strip()
 EMAIL_DAY = (os.getenv("EMAIL_DAY", "FRI").strip() or "FRI").upper()
 HEARTBEAT_PATH = os.getenv("HEARTBEAT_PATH", "runtime/heartbeat.json").strip()
 USE_EXECUTION_DAY_FOR_EMAIL = os.getenv("USE_EXECUTION_DAY_FOR_EMAIL", "1").strip() not in {"0","false","False"}
 
 # Constantes
 GAL_TO_BBL = 42.0
-REQUEST_TIMEOUT = 20
-COLUMNS = [
-    "Data",
-    "Semana Anual",
-    "Petróleo Barril (USD)",
-    "Diesel Barril (USD)",
-    "Variação Petróleo (%)",
-    "Variação Diesel (%)",
-    "Média Móvel semanal Petróleo",
-    "Média móvel mensal Petróleo",
-    "Média móvel Semanal Diesel",
-    "Média Móvel Mensal Diesel",
-    "E-mail Flag",
-    "Spread Absoluto Semanal (USD)",
-    "Diferença Relativa Semanal (%)",
-]
+METRICS_CONTEXT = 30  # maior janela das métricas (média móvel mensal)
 
 # ------------------------------
 # Utilidades HTTP / FRED
@@ -43,10 +35,13 @@ def _ensure_parent_dir(path: str) -> None:
     if parent and not os.path.exists(parent):
         os.makedirs(parent, exist_ok=True)
 
-def _http_get(url: str, params: dict) -> dict:
-    r = requests.get(url, params=params, timeout=REQUEST_TIMEOUT)
-    r.raise_for_status()
-    return r.json()
+# Partes fixas da consulta ao FRED, montadas uma vez na importação
+_FRED_LATEST_PARAMS = MappingProxyType({
+    "api_key": FRED_API_KEY,
+    "file_type": "json",
+    "sort_order": "desc",  # mais recente primeiro: a primeira válida é a última observação
+    "limit": 10,           # folga para feriados ("." no FRED) sem baixar a janela inteira
+})
 
 def _fred_latest_observation(series_id: str, window_days: int = 60) -> tuple[str, float]:
     """Busca a última observação numérica da série dentro de uma janela recente.
@@ -54,19 +49,15 @@ def _fred_latest_observation(series_id: str, window_days: int = 60) -> tuple[str
     if not FRED_API_KEY:
         raise RuntimeError("FRED_API_KEY ausente no .env")
 
-    url = "https://api.stlouisfed.org/fred/series/observations"
     params = {
+        **_FRED_LATEST_PARAMS,
         "series_id": series_id,
-        "api_key": FRED_API_KEY,
-        "file_type": "json",
-        "observation_start": (datetime.utcnow() - timedelta(days=window_days)).strftime("%Y-%m-%d"),
+        "observation_start": (date.today() - timedelta(days=window_days)).isoformat(),
     }
-    data = _http_get(url, params)
-    obs = data.get("observations", [])
-    obs = [o for o in obs if o.get("value") not in (None, ".", "")]
-    if not obs:
+    data = _http_get(_FRED_URL, params, expire_after=_latest_cache_ttl())
+    last = next((o for o in data.get("observations", []) if o.get("value") not in (None, ".", "")), None)
+    if last is None:
         raise RuntimeError(f"Nenhuma observação válida encontrada para {series_id}.")
-    last = obs[-1]
     return last["date"][:10], float(last["value"])
 
 # ------------------------------
@@ -85,12 +76,11 @@ def fetch_diesel_daily_from_fred() -> tuple[str, float]:
 # Suporte: email-day / semana
 # ------------------------------
 _DAY_MAP = {"MON": 0, "TUE": 1, "WED": 2, "THU": 3, "FRI": 4, "SAT": 5, "SUN": 6}
+_TARGET_WEEKDAY = _DAY_MAP.get(EMAIL_DAY, 4)  # Monday=0 ... Sunday=6; default: Friday
 
 def _is_email_day_by_date(date_iso: str) -> bool:
     """True se a data (YYYY-MM-DD) cair no dia configurado em EMAIL_DAY."""
-    w = pd.Timestamp(date_iso).weekday()  # Monday=0 ... Sunday=6
-    target = _DAY_MAP.get(EMAIL_DAY, 4)   # default: Friday
-    return w == target
+    return date.fromisoformat(date_iso).weekday() == _TARGET_WEEKDAY
 
 def _should_send_email(ref_date_iso: str) -> bool:
     """Decide o disparo do e-mail semanal.
@@ -104,27 +94,27 @@ def _should_send_email(ref_date_iso: str) -> bool:
 # ------------------------------
 # Planilha: garantir estrutura e calcular métricas
 # ------------------------------
-def _ensure_sheet(df: pd.DataFrame) -> pd.DataFrame:
-    for col in COLUMNS:
-        if col not in df.columns:
-            df[col] = pd.NA
-    return df[COLUMNS]
-
 def _compute_metrics(df: pd.DataFrame) -> pd.DataFrame:
-    # Tipos de data e semana ISO
-    df["Data"] = pd.to_datetime(df["Data"]).dt.date
-    iso = pd.to_datetime(df["Data"]).dt.isocalendar()
-    df["Semana Anual"] = iso.week.astype(int)
+    # Data como datetime64 (convertida uma vez só) e semana ISO; vira date só na exportação xlsx
+    dates = pd.to_datetime(df["Data"])
+    df["Data"] = dates
+    df["Semana Anual"] = dates.dt.isocalendar().week.astype("int32")
+
+    # Preços convertidos uma única vez (e gravados de volta já em float64)
+    brent = pd.to_numeric(df["Petróleo Barril (USD)"], errors="coerce")
+    diesel = pd.to_numeric(df["Diesel Barril (USD)"], errors="coerce")
+    df["Petróleo Barril (USD)"] = brent
+    df["Diesel Barril (USD)"] = diesel
 
     # Variações diárias (fracionárias)
-    df["Variação Petróleo (%)"] = pd.to_numeric(df["Petróleo Barril (USD)"], errors="coerce").pct_change()
-    df["Variação Diesel (%)"] = pd.to_numeric(df["Diesel Barril (USD)"], errors="coerce").pct_change()
+    df["Variação Petróleo (%)"] = brent.pct_change()
+    df["Variação Diesel (%)"] = diesel.pct_change()
 
     # Médias móveis (7 e 30 dias)
-    df["Média Móvel semanal Petróleo"] = pd.to_numeric(df["Petróleo Barril (USD)"], errors="coerce").rolling(7, min_periods=7).mean()
-    df["Média móvel mensal Petróleo"] = pd.to_numeric(df["Petróleo Barril (USD)"], errors="coerce").rolling(30, min_periods=30).mean()
-    df["Média móvel Semanal Diesel"] = pd.to_numeric(df["Diesel Barril (USD)"], errors="coerce").rolling(7, min_periods=7).mean()
-    df["Média Móvel Mensal Diesel"] = pd.to_numeric(df["Diesel Barril (USD)"], errors="coerce").rolling(30, min_periods=30).mean()
+    df["Média Móvel semanal Petróleo"] = brent.rolling(7, min_periods=7).mean()
+    df["Média móvel mensal Petróleo"] = brent.rolling(30, min_periods=30).mean()
+    df["Média móvel Semanal Diesel"] = diesel.rolling(7, min_periods=7).mean()
+    df["Média Móvel Mensal Diesel"] = diesel.rolling(30, min_periods=30).mean()
 
     # Colunas semanais numéricas
     for col in ["E-mail Flag", "Spread Absoluto Semanal (USD)", "Diferença Relativa Semanal (%)"]:
@@ -132,6 +122,16 @@ def _compute_metrics(df: pd.DataFrame) -> pd.DataFrame:
 
     return df
 
+def _compute_metrics_tail(df: pd.DataFrame, n: int) -> pd.DataFrame:
+    """Calcula as métricas só das últimas n linhas (recém-acrescentadas ao fim da base),
+    usando as METRICS_CONTEXT linhas anteriores como contexto em vez do histórico inteiro.
+    """
+    if len(df) <= n:
+        return _compute_metrics(df)
+    tail = _compute_metrics(df.iloc[-(n + METRICS_CONTEXT):].copy())
+    df.iloc[-n:] = tail.iloc[-n:]
+    return df
+
 # ------------------------------
 # Heartbeat (status)
 # ------------------------------
@@ -143,8 +143,8 @@ def _write_heartbeat(success: bool, error_msg: str | None = None) -> None:
     _ensure_parent_dir(HEARTBEAT_PATH)
     if os.path.exists(HEARTBEAT_PATH):
         try:
-            with open(HEARTBEAT_PATH, "r", encoding="utf-8") as f:
-                hb = json.load(f)
+            with open(HEARTBEAT_PATH, "rb") as f:
+                hb = orjson.loads(f.read())
         except Exception:
             hb = {}
     else:
@@ -160,61 +160,64 @@ def _write_heartbeat(success: bool, error_msg: str | None = None) -> None:
         hb["last_error"] = today_str
         hb["last_error_msg"] = str(error_msg) if error_msg else "Erro não especificado"
 
-    with open(HEARTBEAT_PATH, "w", encoding="utf-8") as f:
-        json.dump(hb, f, ensure_ascii=False, indent=2)
+    # Escrita atômica (temporário + os.replace): uma interrupção nunca deixa o arquivo truncado
+    tmp_path = HEARTBEAT_PATH + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(orjson.dumps(hb, option=orjson.OPT_INDENT_2))
+    os.replace(tmp_path, HEARTBEAT_PATH)
 
 # ------------------------------
 # Atualização com backfill diário
 # ------------------------------
 def _append_row(df: pd.DataFrame, ref_date: str, brent_bbl: float, diesel_bbl: float, email_flag: int) -> pd.DataFrame:
-    spread_abs = (float(diesel_bbl) - float(brent_bbl)) if email_flag == 1 else pd.NA
-    spread_pct = (float(diesel_bbl) / float(brent_bbl) - 1.0) if email_flag == 1 else pd.NA
+    spread_abs = (float(diesel_bbl) - float(brent_bbl)) if email_flag == 1 else np.nan
+    spread_pct = (float(diesel_bbl) / float(brent_bbl) - 1.0) if email_flag == 1 else np.nan
 
+    # NaN em vez de pd.NA: as colunas seguem float64 após o concat (sem cair para object)
     row = {
-        "Data": ref_date,
-        "Semana Anual": pd.NA,
+        "Data": pd.Timestamp(ref_date),
+        "Semana Anual": np.nan,
         "Petróleo Barril (USD)": float(brent_bbl),
         "Diesel Barril (USD)": float(diesel_bbl),
-        "Variação Petróleo (%)": pd.NA,
-        "Variação Diesel (%)": pd.NA,
-        "Média Móvel semanal Petróleo": pd.NA,
-        "Média móvel mensal Petróleo": pd.NA,
-        "Média móvel Semanal Diesel": pd.NA,
-        "Média Móvel Mensal Diesel": pd.NA,
+        "Variação Petróleo (%)": np.nan,
+        "Variação Diesel (%)": np.nan,
+        "Média Móvel semanal Petróleo": np.nan,
+        "Média móvel mensal Petróleo": np.nan,
+        "Média móvel Semanal Diesel": np.nan,
+        "Média Móvel Mensal Diesel": np.nan,
         "E-mail Flag": email_flag,
         "Spread Absoluto Semanal (USD)": spread_abs,
         "Diferença Relativa Semanal (%)": spread_pct,
     }
-    return pd.concat([df, pd.DataFrame([row])], ignore_index=True)
+    new = pd.DataFrame([row])
+    # Base vazia (primeira execução): sem concat com o frame vazio, que o pandas 2.2 marca como deprecated
+    return new if df.empty else pd.concat([df, new], ignore_index=True)
 
 def update_sheet_with_backfill(latest_brent_date: str, latest_brent_bbl: float,
                                latest_diesel_date: str, latest_diesel_bbl: float) -> str:
     """Garante atualização DIÁRIA.
     - Usa o mais recente (ref_date = max(data_brent, data_diesel)).
     - Preenche (forward-fill) os dias faltantes até HOJE com o último valor conhecido.
-    - Decide o e-mail pelo dia de execução (opção padrão)."""
-    # Lê ou cria a planilha
-    try:
-        df = pd.read_excel(SHEET_PATH)
-    except FileNotFoundError:
-        df = pd.DataFrame(columns=COLUMNS)
-
-    _ensure_parent_dir(SHEET_PATH)
+    - Decide o e-mail pelo dia de execução (opção padrão).
+    A base Parquet é gravada sempre; a planilha xlsx só é regerada quando houver e-mail."""
+    df = _load_store()
+    n_stored = len(df)
 
     ref_date = max(latest_brent_date, latest_diesel_date)
     today_iso = date.today().isoformat()
 
-    # Se já existir a ref_date, não duplica (apenas segue para possível backfill até hoje)
-    existing_dates = set(pd.to_datetime(df.get("Data", [])).dt.strftime("%Y-%m-%d")) if not df.empty else set()
+    # Se já existir a ref_date, não duplica (apenas segue para possível backfill até hoje).
+    # "Data" é datetime64: comparação vetorizada no numpy, sem criar strings
+    ref_mask = df["Data"].values == np.datetime64(ref_date)
 
     # 1) Inserir/atualizar a linha da ref_date com os valores mais recentes
-    if ref_date not in existing_dates:
+    if not ref_mask.any():
         email_flag = 1 if _should_send_email(ref_date) else 0
         df = _append_row(df, ref_date, latest_brent_bbl, latest_diesel_bbl, email_flag)
     else:
         # Atualiza spreads se for semana de e-mail
         if _should_send_email(ref_date):
-            idx = df.index[pd.to_datetime(df["Data"]).dt.strftime("%Y-%m-%d") == ref_date][-1]
+            idx = df.index[ref_mask][-1]
             df.at[idx, "E-mail Flag"] = 1
             df.at[idx, "Spread Absoluto Semanal (USD)"] = float(latest_diesel_bbl) - float(latest_brent_bbl)
             df.at[idx, "Diferença Relativa Semanal (%)"] = (float(latest_diesel_bbl) / float(latest_brent_bbl)) - 1.0
@@ -223,25 +226,43 @@ def update_sheet_with_backfill(latest_brent_date: str, latest_brent_bbl: float,
     if df.empty:
         last_date = pd.to_datetime(ref_date).date()
     else:
-        last_date = max(pd.to_datetime(df["Data"]).dt.date)
+        last_date = df["Data"].max().date()
 
     # Valor base a ser carregado para frente (últimos conhecidos)
     last_brent = latest_brent_bbl
     last_diesel = latest_diesel_bbl
 
-    cur = last_date + timedelta(days=1)
-    while cur <= pd.to_datetime(today_iso).date():
-        d_iso = cur.isoformat()
-        email_flag = 1 if _should_send_email(d_iso) else 0
-        df = _append_row(df, d_iso, last_brent, last_diesel, email_flag)
-        cur += timedelta(days=1)
-
-    # 3) Finaliza
-    df = _ensure_sheet(df)
-    df = _compute_metrics(df)
-    df.to_excel(SHEET_PATH, index=False)
-
-    print(f" Planilha atualizada com sucesso em {SHEET_PATH}. Backfill diário aplicado até {today_iso}." )
+    # Bloco inteiro de uma vez (um concat só), em vez de um _append_row por dia
+    dr = pd.date_range(last_date + timedelta(days=1), today_iso, freq="D")
+    if len(dr) > 0:
+        # Uma máscara booleana só, reaproveitada para a flag e os dois spreads
+        if USE_EXECUTION_DAY_FOR_EMAIL:
+            mask = np.full(len(dr), _should_send_email(today_iso))
+        else:
+            mask = dr.weekday.values == _TARGET_WEEKDAY
+        scalar_abs = float(last_diesel) - float(last_brent)
+        scalar_pct = float(last_diesel) / float(last_brent) - 1.0
+        block = pd.DataFrame({
+            "Data": dr,
+            "Petróleo Barril (USD)": float(last_brent),
+            "Diesel Barril (USD)": float(last_diesel),
+            "E-mail Flag": mask.astype(np.int8),
+            "Spread Absoluto Semanal (USD)": np.where(mask, scalar_abs, np.nan),
+            "Diferença Relativa Semanal (%)": np.where(mask, scalar_pct, np.nan),
+        })
+        df = pd.concat([df, block], ignore_index=True)
+
+    # 3) Finaliza: métricas só das linhas novas (as antigas já estão calculadas na base)
+    n_new = len(df) - n_stored
+    if n_new == 1:
+        df = _update_last_row_metrics(df)
+    elif n_new > 1:
+        df = _compute_metrics_tail(df, n_new)
+    _save_store(df)
+    if _should_send_email(today_iso):
+        _flush_xlsx(df)
+
+    print(f" Base atualizada com sucesso em {STORE_PATH}. Backfill diário aplicado até {today_iso}." )
     return today_iso
 
 # ------------------------------
@@ -249,9 +270,8 @@ def update_sheet_with_backfill(latest_brent_date: str, latest_brent_bbl: float,
 # ------------------------------
 if __name__ == "__main__":
     try:
-        # 1) Coleta
-        b_date, b_val = fetch_brent_daily_from_fred()
-        d_date, d_val = fetch_diesel_daily_from_fred()
+        # 1) Coleta (as duas séries em paralelo, sobre a mesma sessão HTTP)
+        (b_date, b_val), (d_date, d_val) = _fetch_pair(fetch_brent_daily_from_fred, fetch_diesel_daily_from_fred)
         print(f"Brent: {b_date} → {b_val:.4f} USD/bbl | Diesel: {d_date} → {d_val:.4f} USD/bbl")
 
         # 2) Atualiza planilha com backfill até hoje
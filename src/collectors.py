@@ -1,12 +1,53 @@
 import os
-import time
+import random
+import orjson
 import requests
+from functools import lru_cache
 from datetime import datetime
 from typing import Tuple, Optional
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 # Conversão de unidade
 GALLON_PER_BARREL = 42.0
 
+# Erros transitórios: só esses justificam nova tentativa (4xx como 401/404 falham na hora)
+RETRY_STATUS = (429, 500, 502, 503, 504)
+MAX_BACKOFF_SECONDS = 10
+
+
+class _JitteredRetry(Retry):
+    """Retry do urllib3 com o backoff do cliente: min(MAX_BACKOFF_SECONDS, backoff * 2**(n-1))
+    multiplicado por um jitter de 0.5 a 1.5. Com backoff=5: ~5s (2.5-7.5s), depois ~10s (5-15s).
+    (O padrão do urllib3 2.x não espera antes da 1ª retentativa e o teto corta o jitter aditivo.)
+    """
+
+    def get_backoff_time(self) -> float:
+        n = sum(1 for h in self.history if h.redirect_location is None)
+        if n == 0:
+            return 0.0
+        return min(MAX_BACKOFF_SECONDS, self.backoff_factor * (2 ** (n - 1))) * random.uniform(0.5, 1.5)
+
+
+@lru_cache(maxsize=None)
+def _session(max_retries: int, backoff_seconds: int) -> requests.Session:
+    """Sessão compartilhada por configuração de retentativa: reaproveita a conexão TLS
+    entre as séries e delega as retentativas ao urllib3 (max_retries = total de tentativas)."""
+    session = requests.Session()
+    session.mount("https://", HTTPAdapter(
+        pool_connections=4,
+        pool_maxsize=4,
+        max_retries=_JitteredRetry(
+            total=max(0, max_retries - 1),  # Retry conta só as repetições, sem a 1ª requisição
+            backoff_factor=backoff_seconds,
+            status_forcelist=RETRY_STATUS,
+            respect_retry_after_header=False,  # um Retry-After longo furaria o teto do backoff
+            raise_on_status=False,  # devolve a última resposta para montar a mensagem de erro
+        ),
+    ))
+    return session
+
+
 class EIAClient:
     """
     Cliente simples para EIA Open Data (endpoint /series).
@@ -18,20 +59,18 @@ class EIAClient:
         self.max_retries = max_retries
         self.backoff_seconds = backoff_seconds
         self.base_url = "https://api.eia.gov/series/"
+        self.session = _session(max_retries, backoff_seconds)
 
     def _request(self, series_id: str) -> dict:
         params = {"api_key": self.api_key, "series_id": series_id}
-        last_err = None
-        for attempt in range(1, self.max_retries + 1):
-            try:
-                r = requests.get(self.base_url, params=params, timeout=20)
-                if r.status_code == 200:
-                    return r.json()
-                last_err = RuntimeError(f"HTTP {r.status_code} - {r.text[:200]}")
-            except Exception as e:
-                last_err = e
-            time.sleep(self.backoff_seconds * (3 ** (attempt - 1)))  # backoff exponencial: 5s,15s,45s...
-        raise RuntimeError(f"Falha ao consultar EIA para série {series_id}: {last_err}")
+        try:
+            r = self.session.get(self.base_url, params=params, timeout=20)
+        except requests.exceptions.RequestException as e:
+            raise RuntimeError(f"Falha ao consultar EIA para série {series_id}: {e}") from e
+        if r.status_code != 200:
+            raise RuntimeError(f"Falha ao consultar EIA para série {series_id}: "
+                               f"HTTP {r.status_code} - {r.text[:200]}")
+        return orjson.loads(r.content)
 
     @staticmethod
     def _parse_eia_date(raw_date: str) -> str: